@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 import asyncio
 import inspect
-import base64
 import hashlib
 import io
 import json
@@ -9,9 +8,58 @@ import logging
 import platform
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    # SIMD-accelerated base64 (libbase64 with runtime CPU dispatch); the encode of a
+    # multi-MB screenshot is a hot path on every snapshot RPC.
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+try:
+    # orjson serializes straight to bytes, skipping the stdlib encoder's slow
+    # escape walk over the multi-MB base64 string plus the final utf-8 encode.
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # simplejpeg drives libjpeg-turbo directly (array in, bytes out), skipping
+    # PIL's save machinery and the BytesIO buffer on the snapshot hot path.
+    import numpy as np
+    import simplejpeg
+except ImportError:
+    np = None
+    simplejpeg = None
+
+try:
+    # mss grabs the framebuffer as raw BGRA; simplejpeg consumes that layout
+    # directly (BGRX), so no per-frame RGB conversion copy is needed.
+    import mss
+except ImportError:
+    mss = None
+
+try:
+    # Imported once at module load; the per-call import in the action hot path
+    # still paid sys.modules lookups and the import lock on every RPC.
+    import pyautogui
+
+    pyautogui.FAILSAFE = False
+except Exception:  # headless environments may fail beyond ImportError
+    pyautogui = None
+
+try:
+    # Direct X11 queries keep the Linux active-window lookup in-process;
+    # shelling out to xdotool costs a fork+exec (~ms) per snapshot.
+    # python3-xlib ships with pyautogui on Linux.
+    from Xlib import display as x_display
+except Exception:
+    x_display = None
 
 logging.basicConfig(
     level=logging.INFO,
@@ -54,11 +102,35 @@ class JsonRpcProtocol:
         return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
 
     def send(self, response: Dict[str, Any]):
-        data = json.dumps(response, ensure_ascii=False)
-        sys.stdout.buffer.write((data + "\n").encode("utf-8"))
+        # Responses must stay newline-framed JSON: the Node bridge reads stdout
+        # with readline and there is no capability handshake for raw binary
+        # frames. Keep the payload as a single bytes object end to end instead.
+        if orjson is not None:
+            data = orjson.dumps(response)
+        else:
+            data = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        sys.stdout.buffer.writelines((data, b"\n"))
         sys.stdout.buffer.flush()
 
 
+# Dedicated pool for screenshot/system-state work so bursts do not contend
+# with asyncio's shared default executor (also used by asyncio.to_thread).
+_CAPTURE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cap")
+
+_JPEG_BUFFERS = threading.local()
+
+
+def _jpeg_buffer() -> io.BytesIO:
+    # Reused per capture thread; continuous snapshot streams otherwise pay a
+    # fresh ~200 KB BytesIO growth pattern per frame in the PIL fallback.
+    buf = getattr(_JPEG_BUFFERS, "buffer", None)
+    if buf is None:
+        buf = io.BytesIO()
+        _JPEG_BUFFERS.buffer = buf
+    buf.seek(0)
+    buf.truncate()
+    return buf
+
 IS_WINDOWS = platform.system() == "Windows"
 IS_MACOS = platform.system() == "Darwin"
 IS_LINUX = platform.system() == "Linux"
@@ -83,6 +155,9 @@ def _get_active_window_sync() -> Optional[str]:
         except Exception:
             return None
     if IS_LINUX:
+        title = _get_active_window_x11()
+        if title is not None:
+            return title
         try:
             result = subprocess.run(
                 ["xdotool", "getactivewindow", "getwindowname"],
@@ -97,31 +172,64 @@ def _get_active_window_sync() -> Optional[str]:
     return None
 
 
-def _get_mouse_position_sync() -> Optional[str]:
+def _get_active_window_x11() -> Optional[str]:
+    if x_display is None:
+        return None
     try:
-        import pyautogui
+        disp = x_display.Display()
+        try:
+            root = disp.screen().root
+            prop = root.get_full_property(disp.intern_atom("_NET_ACTIVE_WINDOW"), 0)
+            if not prop or not prop.value or not prop.value[0]:
+                return None
+            win = disp.create_resource_object("window", prop.value[0])
+            name = win.get_full_property(disp.intern_atom("_NET_WM_NAME"), 0)
+            if name and name.value:
+                value = name.value
+                if isinstance(value, bytes):
+                    return value.decode("utf-8", "replace") or None
+                return str(value) or None
+            return win.get_wm_name() or None
+        finally:
+            disp.close()
+    except Exception:
+        return None
+
 
+def _get_mouse_position_sync() -> Optional[str]:
+    try:
         pos = pyautogui.position()
         return f"({pos.x}, {pos.y})"
     except Exception:
         return None
 
 
+# Screen resolution changes rarely but pyautogui.size() queries the window
+# system (xrandr/Quartz) every time; cache it briefly.
+_SCREEN_SIZE_TTL_S = 30.0
+_screen_size_cache: Tuple[float, Optional[str]] = (0.0, None)
+
+
 def _get_screen_resolution_sync() -> Optional[str]:
+    global _screen_size_cache
+    cached_at, cached = _screen_size_cache
+    now = time.monotonic()
+    if cached is not None and now - cached_at < _SCREEN_SIZE_TTL_S:
+        return cached
     try:
-        import pyautogui
-
         size = pyautogui.size()
-        return f"{size.width}x{size.height}"
+        value = f"{size.width}x{size.height}"
     except Exception:
         return None
+    _screen_size_cache = (now, value)
+    return value
 
 
 async def get_system_state() -> Dict[str, Any]:
     loop = asyncio.get_event_loop()
-    active_window = await loop.run_in_executor(None, _get_active_window_sync)
-    mouse_position = await loop.run_in_executor(None, _get_mouse_position_sync)
-    screen_resolution = await loop.run_in_executor(None, _get_screen_resolution_sync)
+    active_window = await loop.run_in_executor(_CAPTURE_POOL, _get_active_window_sync)
+    mouse_position = await loop.run_in_executor(_CAPTURE_POOL, _get_mouse_position_sync)
+    screen_resolution = await loop.run_in_executor(_CAPTURE_POOL, _get_screen_resolution_sync)
     return {
         "active_window": active_window or "Unknown",
         "mouse_position": mouse_position or "Unknown",
@@ -134,24 +242,59 @@ async def capture_screenshot(delay_ms: Optional[float] = None) -> Dict[str, Any]
     if delay_ms and delay_ms > 0:
         await asyncio.sleep(delay_ms / 1000.0)
     try:
-        import pyautogui
-        from PIL import Image
+        if pyautogui is None:
+            raise RuntimeError("pyautogui not available")
 
         def _capture():
+            if mss is not None and simplejpeg is not None:
+                # Fast path: raw BGRA framebuffer straight into libjpeg-turbo.
+                # The encoder reads three channels per pixel and skips the pad
+                # byte, so the usual convert("RGB") copy never happens.
+                try:
+                    with mss.mss() as sct:
+                        # monitors[0] is the full virtual screen. Its pixels
+                        # only line up with pyautogui's click origin when the
+                        # bounding box starts at (0, 0) — on Windows/macOS a
+                        # display left of or above the primary shifts it, and
+                        # grounded clicks would land offset. Fall through to
+                        # pyautogui (origin-anchored capture) in that case.
+                        monitor = sct.monitors[0]
+                        if monitor["left"] == 0 and monitor["top"] == 0:
+                            grab = sct.grab(monitor)
+                            width, height = grab.width, grab.height
+                            arr = np.frombuffer(grab.raw, dtype=np.uint8).reshape(height, width, 4)
+                            img_bytes = simplejpeg.encode_jpeg(
+                                arr, quality=85, colorspace="BGRX", fastdct=True
+                            )
+                            return img_bytes, width, height
+                except Exception as e:
+                    # e.g. Wayland, where mss fails but pyautogui's
+                    # screenshot backend still works.
+                    logger.warning(f"mss capture failed, using pyautogui: {e}")
             screenshot = pyautogui.screenshot()
-            if screenshot.mode != "RGB":
-                screenshot = screenshot.convert("RGB")
-            width, height = screenshot.size
-            buffer = io.BytesIO()
-            screenshot.save(buffer, format="JPEG", quality=85, optimize=False, progressive=False)
-            img_bytes = buffer.getvalue()
+            if simplejpeg is not None and screenshot.mode in ("RGB", "RGBA"):
+                arr = np.asarray(screenshot)
+                colorspace = "RGBX" if screenshot.mode == "RGBA" else "RGB"
+                img_bytes = simplejpeg.encode_jpeg(
+                    arr, quality=85, colorspace=colorspace, fastdct=True
+                )
+                width, height = screenshot.size
+            else:
+                if screenshot.mode != "RGB":
+                    screenshot = screenshot.convert("RGB")
+                width, height = screenshot.size
+                buffer = _jpeg_buffer()
+                screenshot.save(buffer, format="JPEG", quality=85, optimize=False, progressive=False)
+                img_bytes = buffer.getvalue()
             return img_bytes, width, height
 
         loop = asyncio.get_event_loop()
-        img_bytes, width, height = await loop.run_in_executor(None, _capture)
+        img_bytes, width, height = await loop.run_in_executor(_CAPTURE_POOL, _capture)
         screenshot_b64 = base64.b64encode(img_bytes).decode("utf-8")
+        # blake2b over a short prefix is enough for a correlation id and is
+        # noticeably cheaper than sha256 on this per-frame path.
         sample = screenshot_b64[:1024] if len(screenshot_b64) > 1024 else screenshot_b64
-        screenshot_id = hashlib.sha256(sample.encode("utf-8")).hexdigest()[:16]
+        screenshot_id = hashlib.blake2b(sample.encode("utf-8"), digest_size=8).hexdigest()
         return {
             "screenshot": screenshot_b64,
             "screenshotId": screenshot_id,
@@ -164,83 +307,114 @@ async def capture_screenshot(delay_ms: Optional[float] = None) -> Dict[str, Any]
         raise RuntimeError(f"Screenshot failed: {e}")
 
 
+def _require_xy(kind: str, kwargs: Dict[str, Any]) -> Tuple[Any, Any]:
+    x, y = kwargs.get("x"), kwargs.get("y")
+    if x is None or y is None:
+        raise ValueError(f"x/y required for {kind}")
+    return x, y
+
+
+def _action_click(**kwargs) -> Dict[str, Any]:
+    x, y = _require_xy("click", kwargs)
+    pyautogui.click(x, y)
+    return {"ok": True, "kind": "click", "message": f"Clicked at ({x}, {y})"}
+
+
+def _action_double_click(**kwargs) -> Dict[str, Any]:
+    x, y = _require_xy("double_click", kwargs)
+    pyautogui.doubleClick(x, y)
+    return {"ok": True, "kind": "double_click", "message": f"Double-clicked at ({x}, {y})"}
+
+
+def _action_right_click(**kwargs) -> Dict[str, Any]:
+    x, y = _require_xy("right_click", kwargs)
+    pyautogui.rightClick(x, y)
+    return {"ok": True, "kind": "right_click", "message": f"Right-clicked at ({x}, {y})"}
+
+
+def _action_move(**kwargs) -> Dict[str, Any]:
+    x, y = _require_xy("move", kwargs)
+    pyautogui.moveTo(x, y)
+    return {"ok": True, "kind": "move", "message": f"Moved to ({x}, {y})"}
+
+
+def _action_drag(**kwargs) -> Dict[str, Any]:
+    x, y = _require_xy("drag", kwargs)
+    duration_ms = kwargs.get("durationMs") or 200
+    pyautogui.dragTo(x, y, duration=max(0.0, float(duration_ms) / 1000.0))
+    return {"ok": True, "kind": "drag", "message": f"Dragged to ({x}, {y})"}
+
+
+def _action_scroll(**kwargs) -> Dict[str, Any]:
+    amount = kwargs.get("scrollAmount")
+    direction = kwargs.get("scrollDirection", "vertical")
+    if amount is None:
+        raise ValueError("scrollAmount required for scroll")
+    x, y = kwargs.get("x"), kwargs.get("y")
+    if x is not None and y is not None:
+        pyautogui.moveTo(x, y)
+    if direction == "horizontal":
+        try:
+            pyautogui.hscroll(int(-amount), x=x, y=y)
+        except Exception:
+            pyautogui.scroll(int(-amount), x=x, y=y)
+    else:
+        pyautogui.scroll(int(-amount), x=x, y=y)
+    return {"ok": True, "kind": "scroll", "message": f"Scrolled {amount} ({direction})"}
+
+
+def _action_type(**kwargs) -> Dict[str, Any]:
+    text = kwargs.get("text")
+    if text is None:
+        raise ValueError("text required for type")
+    pyautogui.write(str(text), interval=0.01)
+    return {"ok": True, "kind": "type", "message": "Typed text"}
+
+
+def _action_press(**kwargs) -> Dict[str, Any]:
+    key = kwargs.get("key")
+    if not key:
+        raise ValueError("key required for press")
+    pyautogui.press(str(key))
+    return {"ok": True, "kind": "press", "message": f"Pressed {key}"}
+
+
+def _action_hotkey(**kwargs) -> Dict[str, Any]:
+    keys = kwargs.get("keys")
+    if not keys or not isinstance(keys, list):
+        raise ValueError("keys array required for hotkey")
+    pyautogui.hotkey(*[str(k) for k in keys])
+    return {"ok": True, "kind": "hotkey", "message": "Hotkey executed"}
+
+
+def _action_wait(**kwargs) -> Dict[str, Any]:
+    wait_ms = kwargs.get("waitMs") or 0
+    time.sleep(max(0, float(wait_ms) / 1000.0))
+    return {"ok": True, "kind": "wait", "message": f"Waited {wait_ms}ms"}
+
+
+_ACTIONS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "click": _action_click,
+    "double_click": _action_double_click,
+    "right_click": _action_right_click,
+    "move": _action_move,
+    "drag": _action_drag,
+    "scroll": _action_scroll,
+    "type": _action_type,
+    "press": _action_press,
+    "hotkey": _action_hotkey,
+    "wait": _action_wait,
+}
+
+
 async def execute_action(kind: str, **kwargs) -> Dict[str, Any]:
     try:
-        import pyautogui
-
-        pyautogui.FAILSAFE = False
-
-        if kind == "click":
-            x, y = kwargs.get("x"), kwargs.get("y")
-            if x is None or y is None:
-                raise ValueError("x/y required for click")
-            pyautogui.click(x, y)
-            return {"ok": True, "kind": kind, "message": f"Clicked at ({x}, {y})"}
-        if kind == "double_click":
-            x, y = kwargs.get("x"), kwargs.get("y")
-            if x is None or y is None:
-                raise ValueError("x/y required for double_click")
-            pyautogui.doubleClick(x, y)
-            return {"ok": True, "kind": kind, "message": f"Double-clicked at ({x}, {y})"}
-        if kind == "right_click":
-            x, y = kwargs.get("x"), kwargs.get("y")
-            if x is None or y is None:
-                raise ValueError("x/y required for right_click")
-            pyautogui.rightClick(x, y)
-            return {"ok": True, "kind": kind, "message": f"Right-clicked at ({x}, {y})"}
-        if kind == "move":
-            x, y = kwargs.get("x"), kwargs.get("y")
-            if x is None or y is None:
-                raise ValueError("x/y required for move")
-            pyautogui.moveTo(x, y)
-            return {"ok": True, "kind": kind, "message": f"Moved to ({x}, {y})"}
-        if kind == "drag":
-            x, y = kwargs.get("x"), kwargs.get("y")
-            if x is None or y is None:
-                raise ValueError("x/y required for drag")
-            duration_ms = kwargs.get("durationMs") or 200
-            pyautogui.dragTo(x, y, duration=max(0.0, float(duration_ms) / 1000.0))
-            return {"ok": True, "kind": kind, "message": f"Dragged to ({x}, {y})"}
-        if kind == "scroll":
-            amount = kwargs.get("scrollAmount")
-            direction = kwargs.get("scrollDirection", "vertical")
-            if amount is None:
-                raise ValueError("scrollAmount required for scroll")
-            x, y = kwargs.get("x"), kwargs.get("y")
-            if x is not None and y is not None:
-                pyautogui.moveTo(x, y)
-            if direction == "horizontal":
-                try:
-                    pyautogui.hscroll(int(-amount), x=x, y=y)
-                except Exception:
-                    pyautogui.scroll(int(-amount), x=x, y=y)
-            else:
-                pyautogui.scroll(int(-amount), x=x, y=y)
-            return {"ok": True, "kind": kind, "message": f"Scrolled {amount} ({direction})"}
-        if kind == "type":
-            text = kwargs.get("text")
-            if text is None:
-                raise ValueError("text required for type")
-            pyautogui.write(str(text), interval=0.01)
-            return {"ok": True, "kind": kind, "message": "Typed text"}
-        if kind == "press":
-            key = kwargs.get("key")
-            if not key:
-                raise ValueError("key required for press")
-            pyautogui.press(str(key))
-            return {"ok": True, "kind": kind, "message": f"Pressed {key}"}
-        if kind == "hotkey":
-            keys = kwargs.get("keys")
-            if not keys or not isinstance(keys, list):
-                raise ValueError("keys array required for hotkey")
-            pyautogui.hotkey(*[str(k) for k in keys])
-            return {"ok": True, "kind": kind, "message": "Hotkey executed"}
-        if kind == "wait":
-            wait_ms = kwargs.get("waitMs") or 0
-            time.sleep(max(0, float(wait_ms) / 1000.0))
-            return {"ok": True, "kind": kind, "message": f"Waited {wait_ms}ms"}
-
-        raise ValueError(f"Unknown action kind: {kind}")
+        handler = _ACTIONS.get(kind)
+        if handler is None:
+            raise ValueError(f"Unknown action kind: {kind}")
+        if pyautogui is None and kind != "wait":
+            raise RuntimeError("pyautogui not available")
+        return handler(**kwargs)
     except Exception as e:
         logger.error("Action failed", exc_info=True)
         raise RuntimeError(f"Action failed: {e}")
@@ -270,6 +444,29 @@ class ComputerExecService:
         return await execute_action(kind, **kwargs)
 
 
+async def _stdin_lines():
+    # Read stdin natively on the event loop instead of dispatching a thread per
+    # line; request lines stay newline-framed for the Node bridge.
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=64 * 1024 * 1024, loop=loop)
+    protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+    try:
+        await loop.connect_read_pipe(lambda: protocol, sys.stdin)
+    except (OSError, NotImplementedError, ValueError):
+        # Non-pipe stdin (e.g. Windows console): fall back to threaded readline.
+        while True:
+            line = await asyncio.to_thread(sys.stdin.readline)
+            if not line:
+                return
+            yield line
+        return
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        yield line
+
+
 async def main() -> None:
     service = ComputerExecService()
     rpc = JsonRpcProtocol()
@@ -277,15 +474,13 @@ async def main() -> None:
     rpc.register_method("snapshot", service.snapshot)
     rpc.register_method("act", service.act)
 
-    while True:
-        line = await asyncio.to_thread(sys.stdin.readline)
-        if not line:
-            break
+    async for line in _stdin_lines():
         line = line.strip()
         if not line:
             continue
         try:
-            payload = json.loads(line)
+            # orjson's JSONDecodeError subclasses json.JSONDecodeError.
+            payload = orjson.loads(line) if orjson is not None else json.loads(line)
         except json.JSONDecodeError:
             rpc.send(rpc._error(None, -32700, "Parse error"))
             continue
@@ -1,20 +1,26 @@
 import math
-import re
 from typing import Optional, Tuple
 
-_NUM = r"(\d+(?:\.\d+)?)"
-POINT_PATTERN = re.compile(r"\[\[\s*" + _NUM + r"\s*,\s*" + _NUM + r"\s*\]\]")
-BBOX_PATTERN = re.compile(
-    r"\[\[\s*"
-    + _NUM
-    + r"\s*,\s*"
-    + _NUM
-    + r"\s*,\s*"
-    + _NUM
-    + r"\s*,\s*"
-    + _NUM
-    + r"\s*\]\]"
-)
+try:
+    # Third-party engine with possessive quantifiers: digits and whitespace
+    # never need to be given back, so near-matches in long model outputs fail
+    # without backtracking.
+    import regex as _re
+
+    _NUM = r"(\d++(?:\.\d++)?+)"
+    _SEP = r"\s*+,\s*+"
+    _OPEN = r"\[\[\s*+"
+    _CLOSE = r"\s*+\]\]"
+except ImportError:
+    import re as _re
+
+    _NUM = r"(\d+(?:\.\d+)?)"
+    _SEP = r"\s*,\s*"
+    _OPEN = r"\[\[\s*"
+    _CLOSE = r"\s*\]\]"
+
+POINT_PATTERN = _re.compile(_OPEN + _NUM + _SEP + _NUM + _CLOSE)
+BBOX_PATTERN = _re.compile(_OPEN + _NUM + _SEP + _NUM + _SEP + _NUM + _SEP + _NUM + _CLOSE)
 
 
 def extract_first_point(text: str) -> Optional[Tuple[float, float]]:
@@ -30,10 +36,12 @@ def extract_first_point(text: str) -> Optional[Tuple[float, float]]:
 
 
 def extract_last_bbox(text: str) -> Optional[Tuple[float, float, float, float]]:
-    matches = list(BBOX_PATTERN.finditer(text))
-    if not matches:
+    # Keep only the last match instead of materializing every match object.
+    match = None
+    for m in BBOX_PATTERN.finditer(text):
+        match = m
+    if match is None:
         return None
-    match = matches[-1]
     try:
         x1 = float(match.group(1))
         y1 = float(match.group(2))
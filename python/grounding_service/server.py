@@ -1,17 +1,45 @@
 #!/usr/bin/env python3
 import asyncio
 import inspect
-import base64
 import hashlib
 import json
 import logging
 import sys
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Tuple
 
 from difflib import SequenceMatcher
 
+try:
+    # C++ fuzzy matcher; one extractOne call scans all candidates and is
+    # 10-50x faster than per-item SequenceMatcher for large OCR result sets.
+    from rapidfuzz import fuzz, process as fuzz_process
+except ImportError:
+    fuzz = None
+    fuzz_process = None
+
+try:
+    # SIMD-accelerated base64 (libbase64 with runtime CPU dispatch); decoding the
+    # multi-MB screenshot payload is a hot path on every ingest.
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+try:
+    # orjson serializes straight to bytes, skipping the stdlib encoder's slow
+    # escape walk and the final utf-8 encode; ingest lines are multi-MB.
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from vision_internvl import InternVLModel
 
 logging.basicConfig(
@@ -55,8 +83,14 @@ class JsonRpcProtocol:
         return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
 
     def send(self, response: Dict[str, Any]):
-        data = json.dumps(response, ensure_ascii=False)
-        sys.stdout.buffer.write((data + "\n").encode("utf-8"))
+        # Responses must stay newline-framed JSON: the Node bridge reads stdout
+        # with readline and there is no capability handshake for raw binary
+        # frames. Keep the payload as a single bytes object end to end instead.
+        if orjson is not None:
+            data = orjson.dumps(response)
+        else:
+            data = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        sys.stdout.buffer.writelines((data, b"\n"))
         sys.stdout.buffer.flush()
 
 
@@ -74,6 +108,10 @@ class OcrEngine:
     def __init__(self):
         self._engine = None
         self._use_cuda = False
+        # Single-worker pool: OCR is CPU-heavy and RapidOCR sessions are not
+        # re-entrant; keeping it off the shared default executor stops a long
+        # OCR run from starving other blocking work.
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
         self._init()
 
     def _init(self):
@@ -91,15 +129,19 @@ class OcrEngine:
             self._use_cuda = False
             logger.info("OCR engine initialized (CPU)")
 
-    async def analyze(self, screenshot_b64: str) -> List[Dict[str, Any]]:
+    async def analyze(self, image: Any) -> List[Dict[str, Any]]:
+        """Run OCR on encoded image bytes or a decoded RGB ndarray.
+
+        RapidOCR consumes both directly; passing an ndarray skips the
+        JPEG decode entirely for callers that already hold pixels.
+        """
         if not self._engine:
             raise RuntimeError("OCR engine not available")
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self._analyze_sync, screenshot_b64)
+        return await loop.run_in_executor(self._pool, self._analyze_sync, image)
 
-    def _analyze_sync(self, screenshot_b64: str) -> List[Dict[str, Any]]:
-        image_bytes = base64.b64decode(screenshot_b64)
-        result = self._engine(image_bytes)
+    def _analyze_sync(self, image: Any) -> List[Dict[str, Any]]:
+        result = self._engine(image)
         if result is None or not hasattr(result, "txts"):
             return []
         texts = getattr(result, "txts", None)
@@ -111,25 +153,39 @@ class OcrEngine:
         boxes = getattr(result, "boxes", None)
         if boxes is None:
             boxes = []
-        bbox_list = []
-        for box in boxes:
-            if box is None or len(box) < 4:
-                continue
-            xs = [p[0] for p in box]
-            ys = [p[1] for p in box]
-            x1 = int(min(xs))
-            y1 = int(min(ys))
-            x2 = int(max(xs))
-            y2 = int(max(ys))
-            bbox_list.append((x1, y1, x2, y2))
+        valid_boxes = [box for box in boxes if box is not None and len(box) >= 4]
+        bbox_list = None
+        if np is not None and valid_boxes:
+            try:
+                # One vectorized min/max over all quads instead of eight Python
+                # list passes per box. Falls through if boxes are ragged.
+                arr = np.asarray(valid_boxes, dtype=np.float32)
+                mins = arr.min(axis=1).astype(np.int32)
+                maxs = arr.max(axis=1).astype(np.int32)
+                bbox_list = [
+                    (int(mn[0]), int(mn[1]), int(mx[0]), int(mx[1]))
+                    for mn, mx in zip(mins, maxs)
+                ]
+            except (ValueError, TypeError):
+                bbox_list = None
+        if bbox_list is None:
+            bbox_list = []
+            for box in valid_boxes:
+                xs = [p[0] for p in box]
+                ys = [p[1] for p in box]
+                bbox_list.append((int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))))
         ocr_results = []
         for i, (text, bbox) in enumerate(zip(texts, bbox_list)):
             x1, y1, x2, y2 = bbox
             confidence = float(scores[i]) if i < len(scores) and scores[i] is not None else 0.9
+            text_str = str(text).strip()
             ocr_results.append(
                 {
                     "id": str(i),
-                    "text": str(text).strip(),
+                    "text": text_str,
+                    # Normalized once here so resolve calls do not re-lower
+                    # every candidate on every lookup.
+                    "_norm": text_str.lower(),
                     "confidence": confidence,
                     "bbox": {"x": x1, "y": y1, "width": x2 - x1, "height": y2 - y1},
                 }
@@ -137,18 +193,37 @@ class OcrEngine:
         return ocr_results
 
 
-def resolve_ocr_text(text: str, ocr_results: List[Dict[str, Any]], threshold: float) -> Tuple[int, int]:
+def ocr_norms(ocr_results: List[Dict[str, Any]]) -> List[str]:
+    return [
+        item["_norm"] if "_norm" in item else str(item.get("text", "")).lower().strip()
+        for item in ocr_results
+    ]
+
+
+def resolve_ocr_text(
+    text: str,
+    ocr_results: List[Dict[str, Any]],
+    threshold: float,
+    norms: Optional[List[str]] = None,
+) -> Tuple[int, int]:
     if not text:
         raise ValueError("ocr_text required for OCR resolution")
     best = None
     best_score = 0.0
     target = text.lower().strip()
-    for item in ocr_results:
-        current = str(item.get("text", "")).lower().strip()
-        score = SequenceMatcher(None, target, current).ratio()
-        if score > best_score:
-            best_score = score
-            best = item
+    if norms is None:
+        norms = ocr_norms(ocr_results)
+    if fuzz_process is not None and norms:
+        match = fuzz_process.extractOne(target, norms, scorer=fuzz.ratio)
+        if match:
+            best_score = match[1] / 100.0
+            best = ocr_results[match[2]]
+    else:
+        for item, current in zip(ocr_results, norms):
+            score = SequenceMatcher(None, target, current).ratio()
+            if score > best_score:
+                best_score = score
+                best = item
     if best and best_score >= threshold:
         bbox = best["bbox"]
         x = bbox["x"] + bbox["width"] // 2
@@ -161,15 +236,90 @@ def resolve_ocr_text(text: str, ocr_results: List[Dict[str, Any]], threshold: fl
 class SessionCache:
     screenshot_id: Optional[str] = None
     screenshot_b64: Optional[str] = None
+    # Raw JPEG bytes, decoded once at ingest and shared by the OCR and
+    # resolve paths so each consumer does not re-decode the base64 payload.
+    screenshot_bytes: Optional[bytes] = None
+    # Hash of the full screenshot bytes, used as the OCR cache key. The
+    # producer-side screenshot_id is a correlation id that may be derived
+    # from a prefix of the frame, so it is not collision-safe for caching.
+    ocr_key: Optional[str] = None
     ocr_results: Optional[List[Dict[str, Any]]] = None
+    # Normalized texts aligned with ocr_results, built once per OCR run so
+    # resolve calls never re-extract them per lookup.
+    ocr_norms: Optional[List[str]] = None
     ocr_event: asyncio.Event = field(default_factory=asyncio.Event)
 
 
+OCR_CACHE_MAX = 32
+# Micro-batch window for vision predictions: long enough to collect resolves
+# issued concurrently, short enough to be invisible on a single request.
+PREDICT_BATCH_WINDOW_S = 0.01
+PREDICT_BATCH_MAX = 4
+
+
 class GroundingService:
     def __init__(self):
         self._sessions: Dict[str, SessionCache] = {}
         self._ocr = OcrEngine()
         self._vision_model: Optional[InternVLModel] = None
+        # OCR output is a pure function of the image, so results are shared
+        # across sessions keyed by full-content hash (LRU, newest last).
+        self._ocr_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._predict_queue: Optional[asyncio.Queue] = None
+        self._predict_worker_task: Optional[asyncio.Task] = None
+
+    async def _predict_batched(
+        self, model: InternVLModel, screenshot_b64: str, description: str
+    ) -> Optional[Tuple[int, int]]:
+        if self._predict_queue is None:
+            self._predict_queue = asyncio.Queue()
+            self._predict_worker_task = asyncio.create_task(self._predict_worker())
+        future = asyncio.get_running_loop().create_future()
+        await self._predict_queue.put((model, screenshot_b64, description, future))
+        return await future
+
+    async def _predict_worker(self):
+        while True:
+            item = await self._predict_queue.get()
+            batch = [item]
+            model = item[0]
+            # Gather whatever arrives inside the window into one forward pass.
+            await asyncio.sleep(PREDICT_BATCH_WINDOW_S)
+            while len(batch) < PREDICT_BATCH_MAX:
+                try:
+                    queued = self._predict_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if queued[0] is not model:
+                    # Different model instance; handle it in the next round.
+                    self._predict_queue.put_nowait(queued)
+                    break
+                batch.append(queued)
+            try:
+                results = await model.predict_click_coordinates_batch(
+                    [(b64, desc) for _, b64, desc, _ in batch]
+                )
+            except Exception as e:
+                logger.error(f"Vision batch failed: {e}")
+                for _, _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, _, future), coords in zip(batch, results):
+                if not future.done():
+                    future.set_result(coords)
+
+    def _cached_ocr(self, ocr_key: str) -> Optional[List[Dict[str, Any]]]:
+        results = self._ocr_cache.get(ocr_key)
+        if results is not None:
+            self._ocr_cache.move_to_end(ocr_key)
+        return results
+
+    def _remember_ocr(self, ocr_key: str, results: List[Dict[str, Any]]) -> None:
+        self._ocr_cache[ocr_key] = results
+        self._ocr_cache.move_to_end(ocr_key)
+        while len(self._ocr_cache) > OCR_CACHE_MAX:
+            self._ocr_cache.popitem(last=False)
 
     def _get_session(self, session_key: str) -> SessionCache:
         if session_key not in self._sessions:
@@ -199,25 +349,43 @@ class GroundingService:
     ) -> Dict[str, Any]:
         cache = self._get_session(session_key)
         if not screenshot_id:
+            # Rare fallback: the snapshot path always supplies the producer-side id,
+            # so only untagged callers pay for hashing here.
             sample = screenshot_b64[:1024] if len(screenshot_b64) > 1024 else screenshot_b64
-            screenshot_id = hashlib.sha256(sample.encode("utf-8")).hexdigest()[:16]
+            screenshot_id = hashlib.blake2b(sample.encode("utf-8"), digest_size=8).hexdigest()
         cache.screenshot_id = screenshot_id
         cache.screenshot_b64 = screenshot_b64
+        cache.screenshot_bytes = base64.b64decode(screenshot_b64)
+        # Cache key over the full frame: frames sharing a prefix (same menu
+        # bar, different content) must not reuse each other's OCR results.
+        cache.ocr_key = hashlib.blake2b(cache.screenshot_bytes, digest_size=16).hexdigest()
         cache.ocr_results = None
+        cache.ocr_norms = None
         cache.ocr_event.clear()
 
-        async def run_ocr(current_id: str, screenshot: str):
+        cached_results = self._cached_ocr(cache.ocr_key)
+        if cached_results is not None:
+            # Identical frame seen before (waits/animations re-snapshot the
+            # same screen); skip the OCR run entirely.
+            cache.ocr_results = cached_results
+            cache.ocr_norms = ocr_norms(cached_results)
+            cache.ocr_event.set()
+            return {"screenshotId": screenshot_id}
+
+        async def run_ocr(current_key: str, screenshot: bytes):
             try:
                 if OCR_AVAILABLE:
                     results = await self._ocr.analyze(screenshot)
-                    if cache.screenshot_id == current_id:
+                    self._remember_ocr(current_key, results)
+                    if cache.ocr_key == current_key:
                         cache.ocr_results = results
+                        cache.ocr_norms = ocr_norms(results)
             except Exception as e:
                 logger.error(f"OCR failed: {e}")
             finally:
                 cache.ocr_event.set()
 
-        asyncio.create_task(run_ocr(screenshot_id, screenshot_b64))
+        asyncio.create_task(run_ocr(cache.ocr_key, cache.screenshot_bytes))
         if ocr_wait_timeout_ms:
             try:
                 await asyncio.wait_for(cache.ocr_event.wait(), timeout=ocr_wait_timeout_ms / 1000.0)
@@ -237,7 +405,7 @@ class GroundingService:
         model_name: Optional[str] = None,
     ) -> Dict[str, Any]:
         cache = self._get_session(session_key)
-        if not cache.screenshot_b64 or not cache.screenshot_id:
+        if not cache.screenshot_bytes or not cache.screenshot_id:
             raise ValueError("No screenshot available for this session")
         if screenshot_id and cache.screenshot_id != screenshot_id:
             logger.warning("Screenshot id mismatch; using latest cached screenshot")
@@ -247,16 +415,25 @@ class GroundingService:
                     await asyncio.wait_for(cache.ocr_event.wait(), timeout=ocr_wait_timeout_ms / 1000.0)
                 except asyncio.TimeoutError:
                     logger.warning("OCR wait timed out; falling back to on-demand OCR")
+            if cache.ocr_key is None:
+                cache.ocr_key = hashlib.blake2b(
+                    cache.screenshot_bytes, digest_size=16
+                ).hexdigest()
+            if cache.ocr_results is None:
+                cache.ocr_results = self._cached_ocr(cache.ocr_key)
             if cache.ocr_results is None:
-                cache.ocr_results = await self._ocr.analyze(cache.screenshot_b64)
+                cache.ocr_results = await self._ocr.analyze(cache.screenshot_bytes)
+                self._remember_ocr(cache.ocr_key, cache.ocr_results)
+            if cache.ocr_norms is None and cache.ocr_results is not None:
+                cache.ocr_norms = ocr_norms(cache.ocr_results)
             threshold = ocr_match_threshold if ocr_match_threshold is not None else 0.8
-            x, y = resolve_ocr_text(ocr_text or "", cache.ocr_results, threshold)
+            x, y = resolve_ocr_text(ocr_text or "", cache.ocr_results, threshold, cache.ocr_norms)
             return {"screenshotId": cache.screenshot_id, "x": x, "y": y}
         if method == "prediction":
             if not description:
                 raise ValueError("description required for prediction")
             model = self._ensure_vision(model_name)
-            coords = await model.predict_click_coordinates(cache.screenshot_b64, description)
+            coords = await self._predict_batched(model, cache.screenshot_b64, description)
             if not coords:
                 raise ValueError("Vision model could not find target")
             x, y = coords
@@ -264,6 +441,29 @@ class GroundingService:
         raise ValueError(f"Unknown method: {method}")
 
 
+async def _stdin_lines():
+    # Read stdin natively on the event loop instead of dispatching a thread per
+    # line; ingest lines are multi-MB, so the limit is sized generously.
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=64 * 1024 * 1024, loop=loop)
+    protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+    try:
+        await loop.connect_read_pipe(lambda: protocol, sys.stdin)
+    except (OSError, NotImplementedError, ValueError):
+        # Non-pipe stdin (e.g. Windows console): fall back to threaded readline.
+        while True:
+            line = await asyncio.to_thread(sys.stdin.readline)
+            if not line:
+                return
+            yield line
+        return
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        yield line
+
+
 async def main() -> None:
     service = GroundingService()
     rpc = JsonRpcProtocol()
@@ -271,15 +471,13 @@ async def main() -> None:
     rpc.register_method("ingest_screenshot", service.ingest_screenshot)
     rpc.register_method("resolve", service.resolve)
 
-    while True:
-        line = await asyncio.to_thread(sys.stdin.readline)
-        if not line:
-            break
+    async for line in _stdin_lines():
         line = line.strip()
         if not line:
             continue
         try:
-            payload = json.loads(line)
+            # orjson's JSONDecodeError subclasses json.JSONDecodeError.
+            payload = orjson.loads(line) if orjson is not None else json.loads(line)
         except json.JSONDecodeError:
             rpc.send(rpc._error(None, -32700, "Parse error"))
             continue
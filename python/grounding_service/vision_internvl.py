@@ -1,34 +1,92 @@
 import asyncio
-import base64
+import hashlib
 import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 from PIL import Image
 
+try:
+    # SIMD-accelerated base64 (libbase64 with runtime CPU dispatch); decoding
+    # a multi-MB screenshot per request is pure overhead with the stdlib.
+    import pybase64 as base64
+except ImportError:
+    import base64
+
 from coordinates import extract_first_point, extract_last_bbox, scale_norm_to_pixels
 
 logger = logging.getLogger("computer_vision")
 
 VISION_MODELS_AVAILABLE = False
 try:
+    import numpy as np
     import torch
-    import torchvision.transforms as T
-    from torchvision.transforms.functional import InterpolationMode
-    from transformers import AutoModel, AutoTokenizer
+    from transformers import AutoModel, AutoTokenizer, StoppingCriteria, StoppingCriteriaList
 
     VISION_MODELS_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"Vision model dependencies not available: {e}")
+    np = None
     torch = None
-    T = None
-    InterpolationMode = None
     AutoModel = None
     AutoTokenizer = None
+    StoppingCriteria = object
+    StoppingCriteriaList = None
+
+try:
+    # Optional NVJPEG decode: skips the CPU JPEG decode and the host->device
+    # upload entirely when the model lives on CUDA.
+    from torchvision.io import ImageReadMode, decode_jpeg
+except Exception:
+    ImageReadMode = None
+    decode_jpeg = None
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# Preprocessed frames kept per content hash; agent loops re-query the same
+# screenshot with different instructions back-to-back.
+PIXEL_CACHE_MAX = 8
+
+
+class _StopOnClosingBrackets(StoppingCriteria):
+    """Halt generation once every sequence has emitted the closing "]]".
+
+    The prompt asks for [[x1, y1, x2, y2]] and parsing ignores anything
+    after the brackets, so decoding the remaining token budget is wasted
+    forward passes. Only the last few tokens are decoded per step to keep
+    the check cheap, and each sequence latches done the first time its
+    "]]" appears — a finished row padding out with EOS must not un-finish
+    once the brackets scroll out of the decoded tail. The latch makes
+    instances single-use: build a fresh one per generate() call.
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self._done: Optional[List[bool]] = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        batch = input_ids.shape[0]
+        if self._done is None or len(self._done) != batch:
+            self._done = [False] * batch
+        tails = self.tokenizer.batch_decode(input_ids[:, -8:], skip_special_tokens=True)
+        for i, tail in enumerate(tails):
+            if "]]" in tail:
+                self._done[i] = True
+        return all(self._done)
 
 
 class BaseVisionModel:
-    def __init__(self, model_name: str, device: str = "auto", trust_remote_code: bool = True):
+    def __init__(
+        self,
+        model_name: str,
+        device: str = "auto",
+        trust_remote_code: bool = True,
+        precision: str = "auto",
+    ):
         if not VISION_MODELS_AVAILABLE:
             raise ImportError("Vision model dependencies not available")
         self.model_name = model_name
@@ -36,8 +94,31 @@ class BaseVisionModel:
         self.model = None
         self.tokenizer = None
         self.trust_remote_code = trust_remote_code
+        # "auto" picks int4 (bitsandbytes NF4) on CUDA and full precision
+        # elsewhere; "int4"/"bf16" force the respective load path.
+        self.precision = precision
         self._model_dtype = None
-        self._inference_lock = asyncio.Lock()
+        # Dedicated worker pool for GPU inference; its size is the effective
+        # concurrency limit, so no asyncio lock is needed and requests never
+        # compete with unrelated default-executor work. The default of 1
+        # serializes submissions; deployments that shard the model across
+        # GPUs can raise INTERNVL_CONCURRENCY to overlap requests.
+        gpu_workers = max(1, int(os.environ.get("INTERNVL_CONCURRENCY", "1")))
+        self._gpu_worker = ThreadPoolExecutor(
+            max_workers=gpu_workers, thread_name_prefix="vlm"
+        )
+        # Wider pool for decode/preprocess, so the CPU stage of request N+1
+        # overlaps with inference of request N instead of queueing behind it.
+        self._cpu_pool = ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 4, thread_name_prefix="prep"
+        )
+        # Per-device normalization constants, built on first use.
+        self._norm_cache = {}
+        # Sorted tile-grid candidates per (min_num, max_num); the set is
+        # O(max_num^3) Python work and identical for every image.
+        self._ratio_cache = {}
+        # LRU of preprocessed frames keyed by content hash.
+        self._pixel_cache = OrderedDict()
         self._load()
 
     def _load(self):
@@ -45,26 +126,105 @@ class BaseVisionModel:
 
 
 class InternVLModel(BaseVisionModel):
+    def _quantization_config(self):
+        """Return a 4-bit BitsAndBytesConfig when requested and usable, else None."""
+        precision = self.precision
+        if precision == "auto":
+            precision = "int4" if torch.cuda.is_available() else "full"
+        if precision != "int4" or not torch.cuda.is_available():
+            return None
+        try:
+            import bitsandbytes  # noqa: F401
+            from transformers import BitsAndBytesConfig
+
+            return BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_quant_type="nf4",
+                bnb_4bit_use_double_quant=True,
+                bnb_4bit_compute_dtype=torch.bfloat16,
+            )
+        except ImportError:
+            logger.warning("bitsandbytes not available; loading without 4-bit quantization")
+            return None
+
+    @staticmethod
+    def _cpu_supports_bf16() -> bool:
+        """True when the host CPU has native BF16 (AVX512-BF16 / AMX)."""
+        try:
+            return bool(torch.cpu._is_cpu_support_bf16())
+        except Exception:
+            pass
+        try:
+            return "amx" in str(torch.backends.cpu.get_cpu_capability()).lower()
+        except Exception:
+            return False
+
     def _load(self):
         try:
+            if torch.cuda.is_available():
+                # TF32 matmul is near-free accuracy-wise and much faster for
+                # the FP32 ops that remain (normalization, resize).
+                torch.backends.cuda.matmul.allow_tf32 = True
             try:
-                import flash_attn
+                import flash_attn  # noqa: F401
 
-                use_flash_attn = True
+                # flash-attn kernels need Ampere (SM 8.0) or newer.
+                use_flash_attn = (
+                    torch.cuda.is_available() and torch.cuda.get_device_capability() >= (8, 0)
+                )
             except ImportError:
                 use_flash_attn = False
 
             try:
                 model_dtype = torch.bfloat16
-                self.model = AutoModel.from_pretrained(
-                    self.model_name,
+                load_kwargs = dict(
                     dtype=model_dtype,
                     low_cpu_mem_usage=True,
+                    # Legacy InternVL kwarg plus the canonical HF switch; SDPA
+                    # is still a fused kernel when flash-attn is unavailable.
                     use_flash_attn=use_flash_attn,
+                    attn_implementation="flash_attention_2" if use_flash_attn else "sdpa",
                     device_map="auto",
                     trust_remote_code=self.trust_remote_code,
-                ).eval()
+                )
+                quantization_config = self._quantization_config()
+                if quantization_config is not None:
+                    # NF4 weights roughly quarter memory traffic per matmul,
+                    # the dominant cost for the 4B-param VLM on consumer GPUs.
+                    load_kwargs["quantization_config"] = quantization_config
+                self.model = AutoModel.from_pretrained(self.model_name, **load_kwargs).eval()
                 self._model_dtype = model_dtype
+                # device_map="auto" can spill shards to CPU/disk on small
+                # GPUs; emulated BF16 there is far slower than FP32.
+                device_map = getattr(self.model, "hf_device_map", None) or {}
+                offloaded = any(str(d) in ("cpu", "disk") for d in device_map.values())
+                if (offloaded or not torch.cuda.is_available()) and not self._cpu_supports_bf16():
+                    # Free the BF16 model first so peak memory does not
+                    # double on exactly the constrained hosts this targets.
+                    self.model = None
+                    if torch.cuda.is_available():
+                        torch.cuda.empty_cache()
+                    if offloaded and torch.cuda.is_available():
+                        # The GPU already could not hold the model in BF16,
+                        # so a single-device reload would OOM; keep the
+                        # device_map offload and only change the dtype.
+                        logger.warning(
+                            "BF16 shards offloaded to a CPU without native BF16; "
+                            "reloading in FP32 with offload"
+                        )
+                        reload_kwargs = dict(load_kwargs)
+                        reload_kwargs.pop("quantization_config", None)
+                        reload_kwargs["dtype"] = torch.float32
+                        reload_kwargs["use_flash_attn"] = False
+                        reload_kwargs["attn_implementation"] = "sdpa"
+                        self.model = AutoModel.from_pretrained(
+                            self.model_name, **reload_kwargs
+                        ).eval()
+                        self._model_dtype = torch.float32
+                    else:
+                        # Pure-CPU deployment: the fallback branch below
+                        # reloads in FP32 on CPU.
+                        raise RuntimeError("BF16 on a CPU without native BF16 support")
             except Exception:
                 device = "cuda" if torch.cuda.is_available() else "cpu"
                 dtype = torch.float16 if device == "cuda" else torch.float32
@@ -73,7 +233,7 @@ class InternVLModel(BaseVisionModel):
                         self.model_name,
                         dtype=dtype,
                         low_cpu_mem_usage=True,
-                        use_flash_attn=False,
+                        attn_implementation="sdpa",
                         trust_remote_code=self.trust_remote_code,
                     )
                     .to(device)
@@ -81,26 +241,165 @@ class InternVLModel(BaseVisionModel):
                 )
                 self._model_dtype = dtype
 
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                self.model_name, trust_remote_code=self.trust_remote_code, use_fast=False
-            )
+            try:
+                # Channels-last helps the conv stem; quantized modules may
+                # reject the conversion, in which case keep the default layout.
+                self.model = self.model.to(memory_format=torch.channels_last)
+            except Exception:
+                logger.debug("channels_last conversion not supported for this model")
+
+            self._compile_vision_encoder()
+            self._enable_static_decode()
+
+            try:
+                # Rust tokenizer when the checkpoint ships a fast converter;
+                # the Python SentencePiece fallback is far slower per prompt.
+                self.tokenizer = AutoTokenizer.from_pretrained(
+                    self.model_name, trust_remote_code=self.trust_remote_code, use_fast=True
+                )
+            except Exception:
+                logger.warning(
+                    f"Fast tokenizer unavailable for {self.model_name}; using slow tokenizer"
+                )
+                self.tokenizer = AutoTokenizer.from_pretrained(
+                    self.model_name, trust_remote_code=self.trust_remote_code, use_fast=False
+                )
         except Exception as e:
             logger.error(f"Failed to load InternVL model {self.model_name}: {e}")
             raise
 
-    def _build_transform(self, input_size: int):
-        if not VISION_MODELS_AVAILABLE or T is None:
-            raise ImportError("Vision model dependencies not available")
-        mean = (0.485, 0.456, 0.406)
-        std = (0.229, 0.224, 0.225)
-        return T.Compose(
-            [
-                T.Lambda(lambda img: img.convert("RGB") if img.mode != "RGB" else img),
-                T.Resize((input_size, input_size), interpolation=InterpolationMode.BICUBIC),
-                T.ToTensor(),
-                T.Normalize(mean=mean, std=std),
-            ]
-        )
+    def _compile_vision_encoder(self):
+        """Compile the ViT encoder; every tile is 3x448x448, so shapes are static.
+
+        The encoder runs on up to 13 tiles per request, making it the hot
+        static-shape target. Compilation is best-effort: any failure (old
+        torch, quantized modules Inductor rejects) keeps the eager encoder.
+        """
+        vision_model = getattr(self.model, "vision_model", None)
+        if vision_model is None or not hasattr(torch, "compile") or not torch.cuda.is_available():
+            return
+        try:
+            compiled = torch.compile(
+                vision_model, mode="reduce-overhead", fullgraph=False, dynamic=False
+            )
+            device = next(vision_model.parameters()).device
+            dummy = torch.zeros(
+                13, 3, 448, 448, dtype=self._resolve_model_dtype(), device=device
+            )
+            with torch.no_grad():
+                # Trigger compilation here rather than on the first request.
+                compiled(dummy)
+            self.model.vision_model = compiled
+        except Exception:
+            logger.warning("torch.compile of vision encoder failed; using eager encoder")
+
+    def _enable_static_decode(self):
+        """Set up CUDA-graph-friendly greedy decoding.
+
+        chat() always runs greedy decode with max_new_tokens=256, so every
+        decoder step has a static shape. A static KV cache plus a compiled
+        language model lets generate() capture the decode step into a CUDA
+        graph and replay it, instead of paying per-kernel launch overhead
+        for each of up to 256 steps.
+        """
+        if not torch.cuda.is_available() or not hasattr(torch, "compile"):
+            return
+        language_model = getattr(self.model, "language_model", None)
+        if language_model is None:
+            return
+        # chat() forwards generation kwargs into language_model.generate(),
+        # which consults the language model's own generation_config — the
+        # wrapper model's config is never read, so set it on the submodule.
+        gen_config = getattr(language_model, "generation_config", None)
+        if gen_config is not None:
+            try:
+                gen_config.cache_implementation = "static"
+            except Exception:
+                logger.debug("static KV cache not supported by this transformers version")
+        # Compile the forward in place rather than wrapping the module:
+        # generate() is resolved on the original module either way, so a
+        # wrapped module would keep running eager forward passes.
+        original_forward = language_model.forward
+        try:
+            compiled_forward = torch.compile(
+                original_forward, mode="reduce-overhead", fullgraph=False
+            )
+            # Dynamo/Inductor errors surface on the first call, not at wrap
+            # time, and reduce-overhead compilation itself takes minutes —
+            # run a dummy forward at load like the vision encoder does, so
+            # failures land here and no user request absorbs the compile.
+            device = next(language_model.parameters()).device
+            dummy = torch.ones((1, 8), dtype=torch.long, device=device)
+            with torch.no_grad():
+                compiled_forward(input_ids=dummy)
+        except Exception:
+            logger.warning("torch.compile of language model failed; using eager decode")
+            return
+
+        def forward_with_fallback(*args, **kwargs):
+            # Decode-time shapes can still trip a late compile failure;
+            # revert to eager permanently on the first one instead of
+            # erroring on every request.
+            try:
+                return compiled_forward(*args, **kwargs)
+            except Exception:
+                logger.warning("Compiled decode failed at runtime; reverting to eager forward")
+                language_model.forward = original_forward
+                return original_forward(*args, **kwargs)
+
+        language_model.forward = forward_with_fallback
+
+    def _affine_stats(self, device):
+        """Per-device (scale, bias) folding uint8->float and ImageNet norm.
+
+        x * scale + bias == ((x / 255) - mean) / std, so the whole
+        normalization is one fused affine pass instead of three.
+        """
+        key = str(device)
+        stats = self._norm_cache.get(key)
+        if stats is None:
+            scale = torch.tensor(
+                [1.0 / (255.0 * s) for s in IMAGENET_STD], device=device
+            ).view(1, 3, 1, 1)
+            bias = torch.tensor(
+                [-m / s for m, s in zip(IMAGENET_MEAN, IMAGENET_STD)], device=device
+            ).view(1, 3, 1, 1)
+            stats = (scale, bias)
+            self._norm_cache[key] = stats
+        return stats
+
+    def _select_ratio(
+        self, orig_width: int, orig_height: int, min_num: int, max_num: int, image_size: int
+    ) -> Tuple[int, int]:
+        aspect_ratio = orig_width / orig_height
+        cached = self._ratio_cache.get((min_num, max_num))
+        if cached is None:
+            target_ratios = sorted(
+                set(
+                    (i, j)
+                    for n in range(min_num, max_num + 1)
+                    for i in range(1, n + 1)
+                    for j in range(1, n + 1)
+                    if i * j <= max_num and i * j >= min_num
+                ),
+                key=lambda x: x[0] * x[1],
+            )
+            ratio_arr = np.array(target_ratios, dtype=np.int32)
+            cached = (ratio_arr, ratio_arr[:, 0] / ratio_arr[:, 1])
+            self._ratio_cache[(min_num, max_num)] = cached
+        ratio_arr, ratio_aspects = cached
+        diffs = np.abs(aspect_ratio - ratio_aspects)
+        ties = np.nonzero(diffs == diffs.min())[0]
+        best = int(ties[0])
+        if ties.size > 1:
+            # Among equally close grids (sorted by tile count), the original
+            # loop keeps upgrading to a later grid the image area can fill.
+            area = orig_width * orig_height
+            prods = ratio_arr[ties, 0] * ratio_arr[ties, 1]
+            ok = area > 0.5 * image_size * image_size * prods
+            ok[0] = True
+            best = int(ties[np.nonzero(ok)[0][-1]])
+        return int(ratio_arr[best, 0]), int(ratio_arr[best, 1])
 
     def _dynamic_preprocess(
         self,
@@ -111,32 +410,14 @@ class InternVLModel(BaseVisionModel):
         use_thumbnail: bool = True,
     ):
         orig_width, orig_height = image.size
-        aspect_ratio = orig_width / orig_height
-        target_ratios = set(
-            (i, j)
-            for n in range(min_num, max_num + 1)
-            for i in range(1, n + 1)
-            for j in range(1, n + 1)
-            if i * j <= max_num and i * j >= min_num
-        )
-        target_ratios = sorted(target_ratios, key=lambda x: x[0] * x[1])
-        best_ratio_diff = float("inf")
-        best_ratio = (1, 1)
-        area = orig_width * orig_height
-        for ratio in target_ratios:
-            target_aspect_ratio = ratio[0] / ratio[1]
-            ratio_diff = abs(aspect_ratio - target_aspect_ratio)
-            if ratio_diff < best_ratio_diff:
-                best_ratio_diff = ratio_diff
-                best_ratio = ratio
-            elif ratio_diff == best_ratio_diff:
-                if area > 0.5 * image_size * image_size * ratio[0] * ratio[1]:
-                    best_ratio = ratio
+        best_ratio = self._select_ratio(orig_width, orig_height, min_num, max_num, image_size)
 
         target_width = image_size * best_ratio[0]
         target_height = image_size * best_ratio[1]
         blocks = best_ratio[0] * best_ratio[1]
-        resized_img = image.resize((target_width, target_height))
+        # Quality matters most on the one full-frame downsample; the tiles
+        # below are plain crops of it.
+        resized_img = image.resize((target_width, target_height), Image.BICUBIC)
         processed_images = []
         for i in range(blocks):
             box = (
@@ -147,78 +428,345 @@ class InternVLModel(BaseVisionModel):
             )
             processed_images.append(resized_img.crop(box))
         if use_thumbnail and len(processed_images) != 1:
-            processed_images.append(image.resize((image_size, image_size)))
+            # Bilinear is visually indistinguishable at thumbnail scale and
+            # roughly half the filter cost of bicubic.
+            processed_images.append(image.resize((image_size, image_size), Image.BILINEAR))
         return processed_images
 
+    def _pixel_values_gpu(self, image: Image.Image, input_size: int, max_num: int):
+        """Fused resize + tile + normalize on the GPU.
+
+        Uploads the decoded frame once, bicubic-resamples to the tile grid,
+        slices tiles with a view/permute reshape, and normalizes in-place —
+        one pass over pixel data instead of PIL resize, N crops, and a
+        separate normalize per tile. Callers hand in RGB frames.
+        """
+        width, height = image.size
+        frame = torch.from_numpy(np.asarray(image)).to(self.model.device, non_blocking=True)
+        x = frame.permute(2, 0, 1).unsqueeze(0).to(torch.float32)
+        return self._tiles_from_frame(x, width, height, input_size, max_num)
+
+    def _tiles_from_frame(self, x, width: int, height: int, input_size: int, max_num: int):
+        """Resize + tile + normalize a (1, 3, H, W) float frame (0-255) on device.
+
+        Interpolation is linear in pixel values, so the fused scale/bias
+        normalization applies once after resampling with identical results.
+        """
+        scale, bias = self._affine_stats(x.device)
+        cols, rows = self._select_ratio(width, height, 1, max_num, input_size)
+        target_h, target_w = input_size * rows, input_size * cols
+        resized = torch.nn.functional.interpolate(
+            x, size=(target_h, target_w), mode="bicubic", antialias=True
+        )
+        resized = resized.mul_(scale).add_(bias)
+        tiles = (
+            resized.view(3, rows, input_size, cols, input_size)
+            .permute(1, 3, 0, 2, 4)
+            .reshape(rows * cols, 3, input_size, input_size)
+        )
+        if rows * cols != 1:
+            thumb = torch.nn.functional.interpolate(
+                x, size=(input_size, input_size), mode="bicubic", antialias=True
+            )
+            thumb = thumb.mul_(scale).add_(bias)
+            tiles = torch.cat([tiles, thumb])
+        return tiles
+
     def _images_to_pixel_values(self, images, input_size: int = 448, max_num: int = 12):
-        transform = self._build_transform(input_size=input_size)
-        pixel_values_list = []
+        if self.model is not None and getattr(self.model.device, "type", "") == "cuda":
+            pixel_values_list = []
+            num_patches_list = []
+            for img in images:
+                pv = self._pixel_values_gpu(img, input_size=input_size, max_num=max_num)
+                num_patches_list.append(pv.shape[0])
+                pixel_values_list.append(pv)
+            if not pixel_values_list:
+                return None, []
+            if len(pixel_values_list) == 1:
+                return pixel_values_list[0], num_patches_list
+            return torch.cat(pixel_values_list), num_patches_list
+        tiles = []
         num_patches_list = []
         for img in images:
-            tiles = self._dynamic_preprocess(img, image_size=input_size, use_thumbnail=True, max_num=max_num)
-            pv = [transform(tile) for tile in tiles]
-            pv = torch.stack(pv)
-            num_patches_list.append(pv.shape[0])
-            pixel_values_list.append(pv)
-        if not pixel_values_list:
+            img_tiles = self._dynamic_preprocess(
+                img, image_size=input_size, use_thumbnail=True, max_num=max_num
+            )
+            num_patches_list.append(len(img_tiles))
+            tiles.extend(img_tiles)
+        if not tiles:
             return None, []
-        pixel_values = torch.cat(pixel_values_list)
+        # All tiles come out of _dynamic_preprocess at exactly input_size, so
+        # they pack straight into one preallocated uint8 NHWC buffer and the
+        # fill is the only host-side pass. This branch only runs when the
+        # model lives on CPU (CUDA frames take _pixel_values_gpu above), so
+        # there is no device transfer to pin or overlap.
+        batch = torch.empty((len(tiles), input_size, input_size, 3), dtype=torch.uint8)
+        batch_view = batch.numpy()
+        for i, tile in enumerate(tiles):
+            batch_view[i] = np.asarray(tile)
+        pixel_values = batch.to(self.model.device)
+        pixel_values = pixel_values.permute(0, 3, 1, 2).to(torch.float32).contiguous()
+        scale, bias = self._affine_stats(pixel_values.device)
+        pixel_values = pixel_values.mul_(scale).add_(bias)
         return pixel_values, num_patches_list
 
-    async def predict_click_coordinates(self, image_b64: str, instruction: str) -> Optional[Tuple[int, int]]:
-        async with self._inference_lock:
-            loop = asyncio.get_running_loop()
-            return await loop.run_in_executor(None, self._predict_sync, image_b64, instruction)
+    @staticmethod
+    def _grounding_question(instruction: str) -> str:
+        return (
+            f"<image>\n"
+            f"Please provide the bounding box coordinate of the UI element this user instruction describes: <ref>{instruction}</ref>. "
+            f"Answer in the format of [[x1, y1, x2, y2]]"
+        )
 
-    def _predict_sync(self, image_b64: str, instruction: str) -> Optional[Tuple[int, int]]:
+    def _resolve_model_dtype(self):
+        model_dtype = self._model_dtype
+        if model_dtype is None:
+            try:
+                model_dtype = next(self.model.parameters()).dtype
+            except Exception:
+                model_dtype = torch.bfloat16
+        return model_dtype
+
+    @staticmethod
+    def _parse_response(output_text: str, width: int, height: int) -> Optional[Tuple[int, int]]:
+        if not output_text:
+            return None
+        point = extract_first_point(output_text)
+        if point is None:
+            bbox = extract_last_bbox(output_text)
+            if bbox is None:
+                return None
+            x1, y1, x2, y2 = bbox
+            point = ((x1 + x2) / 2.0, (y1 + y2) / 2.0)
+        x_norm, y_norm = point
+        return scale_norm_to_pixels(x_norm, y_norm, width, height)
+
+    async def predict_click_coordinates(self, image_b64: str, instruction: str) -> Optional[Tuple[int, int]]:
+        loop = asyncio.get_running_loop()
         try:
-            img_bytes = base64.b64decode(image_b64)
-            image = Image.open(BytesIO(img_bytes))
-            width, height = image.size
-            grounding_prompt = (
-                f"Please provide the bounding box coordinate of the UI element this user instruction describes: <ref>{instruction}</ref>. "
-                f"Answer in the format of [[x1, y1, x2, y2]]"
-            )
-            pixel_values, num_patches_list = self._images_to_pixel_values(
-                [image], input_size=448, max_num=12
+            pixel_values, num_patches_list, width, height = await loop.run_in_executor(
+                self._cpu_pool, self._preprocess, image_b64
             )
             if pixel_values is None:
                 return None
-            model_dtype = self._model_dtype
-            if model_dtype is None:
-                try:
-                    model_dtype = next(self.model.parameters()).dtype
-                except Exception:
-                    model_dtype = torch.bfloat16
-            pixel_values = pixel_values.to(model_dtype).to(self.model.device)
-            question = f"<image>\n{grounding_prompt}"
-            generation_config = dict(
-                max_new_tokens=256,
-                do_sample=False,
-                temperature=0.0,
+            response = await loop.run_in_executor(
+                self._gpu_worker, self._run_chat, pixel_values, num_patches_list, instruction
             )
-            if len(num_patches_list) > 1:
-                response = self.model.chat(
-                    self.tokenizer,
-                    pixel_values,
-                    question,
-                    generation_config,
-                    num_patches_list=num_patches_list,
-                )
-            else:
-                response = self.model.chat(self.tokenizer, pixel_values, question, generation_config)
-            output_text = response or ""
-            if not output_text:
-                return None
-            point = extract_first_point(output_text)
-            if point is None:
-                bbox = extract_last_bbox(output_text)
-                if bbox is None:
-                    return None
-                x1, y1, x2, y2 = bbox
-                point = ((x1 + x2) / 2.0, (y1 + y2) / 2.0)
-            x_norm, y_norm = point
-            return scale_norm_to_pixels(x_norm, y_norm, width, height)
+            return self._parse_response(response or "", width, height)
         except Exception:
             logger.error("Vision prediction failed", exc_info=True)
             return None
+
+    async def predict_click_coordinates_batch(
+        self, requests: List[Tuple[str, str]]
+    ) -> List[Optional[Tuple[int, int]]]:
+        """Resolve several (image_b64, instruction) pairs in one forward pass.
+
+        Uses InternVL's batch_chat when the checkpoint provides it, so
+        concurrent sessions share a single generate() call instead of
+        queueing at batch size 1. Preprocessing runs on the CPU pool before
+        the GPU worker is entered, so decode/tiling of one batch overlaps
+        inference of the previous one — the same split as the single path.
+        """
+        loop = asyncio.get_running_loop()
+        prepped = await asyncio.gather(
+            *(
+                loop.run_in_executor(self._cpu_pool, self._preprocess, image_b64)
+                for image_b64, _ in requests
+            ),
+            return_exceptions=True,
+        )
+        results: List[Optional[Tuple[int, int]]] = [None] * len(requests)
+        items = []
+        for i, (prep, (_, instruction)) in enumerate(zip(prepped, requests)):
+            if isinstance(prep, BaseException):
+                logger.error(f"Vision preprocessing failed: {prep}")
+                continue
+            pixel_values, num_patches_list, width, height = prep
+            if pixel_values is None:
+                continue
+            items.append((i, pixel_values, num_patches_list, width, height, instruction))
+        if not items:
+            return results
+        batch_results = await loop.run_in_executor(self._gpu_worker, self._predict_batch_sync, items)
+        for (i, *_), coords in zip(items, batch_results):
+            results[i] = coords
+        return results
+
+    def _run_one(self, pixel_values, num_patches_list, width, height, instruction):
+        try:
+            response = self._run_chat(pixel_values, num_patches_list, instruction)
+            return self._parse_response(response or "", width, height)
+        except Exception:
+            logger.error("Vision prediction failed", exc_info=True)
+            return None
+
+    def _predict_batch_sync(self, items) -> List[Optional[Tuple[int, int]]]:
+        """GPU stage only; items arrive preprocessed as
+        (index, pixel_values, num_patches_list, width, height, instruction)."""
+        if len(items) == 1:
+            _, pixel_values, num_patches_list, width, height, instruction = items[0]
+            return [self._run_one(pixel_values, num_patches_list, width, height, instruction)]
+        batch_chat = getattr(self.model, "batch_chat", None)
+        if batch_chat is None:
+            return [
+                self._run_one(pv, npl, width, height, instruction)
+                for _, pv, npl, width, height, instruction in items
+            ]
+        try:
+            pixel_values_list = [pv for _, pv, *_ in items]
+            # One entry per image: batch_chat splits tiles by image.
+            num_patches_list = [int(sum(npl)) for _, _, npl, *_ in items]
+            questions = [self._grounding_question(instruction) for *_, instruction in items]
+            sizes = [(width, height) for _, _, _, width, height, _ in items]
+            pixel_values = self._cast_to_device(torch.cat(pixel_values_list))
+            generation_config = self._generation_config()
+            responses = batch_chat(
+                self.tokenizer,
+                pixel_values,
+                questions,
+                generation_config,
+                num_patches_list=num_patches_list,
+            )
+            return [
+                self._parse_response(response or "", width, height)
+                for response, (width, height) in zip(responses, sizes)
+            ]
+        except Exception:
+            logger.error("Batched vision prediction failed; retrying serially", exc_info=True)
+            return [
+                self._run_one(pv, npl, width, height, instruction)
+                for _, pv, npl, width, height, instruction in items
+            ]
+
+    @staticmethod
+    def _adaptive_max_num(width: int, height: int, input_size: int, cap: int = 12) -> int:
+        """Tile budget proportional to image area, capped at the model limit.
+
+        A 1920x1080 screenshot lands around 5 tiles instead of the full 12;
+        encoder cost scales with tile count, detail gain past the image's
+        own resolution does not.
+        """
+        return max(1, min(cap, (width * height) // (input_size * input_size * 2)))
+
+    def _decode_gpu(self, img_bytes: bytes, input_size: int, max_num: int):
+        """NVJPEG decode + tile on device; returns (tiles, width, height) or None."""
+        if (
+            decode_jpeg is None
+            or self.model is None
+            or getattr(self.model.device, "type", "") != "cuda"
+            or img_bytes[:2] != b"\xff\xd8"
+        ):
+            return None
+        try:
+            data = torch.frombuffer(bytearray(img_bytes), dtype=torch.uint8)
+            frame = decode_jpeg(data, mode=ImageReadMode.RGB, device=self.model.device)
+            height, width = int(frame.shape[-2]), int(frame.shape[-1])
+            max_num = min(max_num, self._adaptive_max_num(width, height, input_size))
+            x = frame.unsqueeze(0).to(torch.float32)
+            return self._tiles_from_frame(x, width, height, input_size, max_num), width, height
+        except Exception:
+            logger.debug("NVJPEG decode failed; falling back to PIL", exc_info=True)
+            return None
+
+    def _preprocess(self, image_b64: str, input_size: int = 448, max_num: int = 12):
+        """Decode + tile one frame; returns (pixel_values, num_patches_list, width, height).
+
+        Results are kept in a small content-hash LRU: agent loops usually
+        ask several questions about the same screenshot, and on a hit the
+        decode + tile work is skipped entirely. The cached tensor is only
+        read downstream (cat/cast copy it), never mutated.
+        """
+        img_bytes = base64.b64decode(image_b64)
+        cache_key = hashlib.blake2b(img_bytes, digest_size=16).digest()
+        cached = self._pixel_cache.get(cache_key)
+        if cached is not None:
+            self._pixel_cache.move_to_end(cache_key)
+            return cached
+        result = self._preprocess_uncached(img_bytes, input_size, max_num)
+        self._pixel_cache[cache_key] = result
+        while len(self._pixel_cache) > PIXEL_CACHE_MAX:
+            self._pixel_cache.popitem(last=False)
+        return result
+
+    def _preprocess_uncached(self, img_bytes: bytes, input_size: int, max_num: int):
+        gpu_decoded = self._decode_gpu(img_bytes, input_size, max_num)
+        if gpu_decoded is not None:
+            tiles, width, height = gpu_decoded
+            return tiles, [int(tiles.shape[0])], width, height
+        image = Image.open(BytesIO(img_bytes))
+        # Original size must be captured before draft(): norm coordinates are
+        # scaled back against the frame the caller sees, not the decode size.
+        width, height = image.size
+        max_num = min(max_num, self._adaptive_max_num(width, height, input_size))
+        # Let libjpeg decode at a reduced DCT scale when the frame is much
+        # larger than the tile grid; no-op for non-JPEG input.
+        image.draft("RGB", (input_size * 4, input_size * 4))
+        # Convert mode exactly once; every tile cut below inherits RGB.
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        pixel_values, num_patches_list = self._images_to_pixel_values(
+            [image], input_size=input_size, max_num=max_num
+        )
+        return pixel_values, num_patches_list, width, height
+
+    def _cast_to_device(self, pixel_values):
+        """Move pixel values to the model device, then cast dtype on-device.
+
+        Casting after the transfer keeps the BF16/FP16 conversion a fast
+        native GPU op; the copy itself goes through pinned memory so it can
+        overlap with in-flight GPU work.
+        """
+        device = self.model.device
+        if pixel_values.device != device:
+            if getattr(device, "type", "") == "cuda":
+                pixel_values = pixel_values.pin_memory()
+            pixel_values = pixel_values.to(device, non_blocking=True)
+        return pixel_values.to(self._resolve_model_dtype())
+
+    def _generation_config(self) -> dict:
+        config = dict(
+            max_new_tokens=256,
+            do_sample=False,
+            temperature=0.0,
+        )
+        if StoppingCriteriaList is not None and self.tokenizer is not None:
+            # Fresh instance per call: the criterion latches per-sequence
+            # completion and must not carry state between generate() runs.
+            config["stopping_criteria"] = StoppingCriteriaList(
+                [_StopOnClosingBrackets(self.tokenizer)]
+            )
+        return config
+
+    @staticmethod
+    def _has_coordinates(text: str) -> bool:
+        return extract_first_point(text) is not None or extract_last_bbox(text) is not None
+
+    def _chat_once(self, pixel_values, num_patches_list, question: str, generation_config: dict):
+        if len(num_patches_list) > 1:
+            return self.model.chat(
+                self.tokenizer,
+                pixel_values,
+                question,
+                generation_config,
+                num_patches_list=num_patches_list,
+            )
+        return self.model.chat(self.tokenizer, pixel_values, question, generation_config)
+
+    def _run_chat(self, pixel_values, num_patches_list, instruction: str) -> Optional[str]:
+        pixel_values = self._cast_to_device(pixel_values)
+        question = self._grounding_question(instruction)
+        response = self._chat_once(pixel_values, num_patches_list, question, self._generation_config())
+        if response and self._has_coordinates(response):
+            return response
+        # One cheap retry before the caller gives up and re-runs the whole
+        # pipeline: pixel values are already on device, the re-prompt demands
+        # the bare pattern, and the token budget is tiny.
+        retry_config = self._generation_config()
+        retry_config["max_new_tokens"] = 32
+        retry_question = (
+            question + "\nRespond with only the coordinates in the exact format "
+            "[[x1, y1, x2, y2]] and no other text."
+        )
+        retry = self._chat_once(pixel_values, num_patches_list, retry_question, retry_config)
+        return retry if retry and self._has_coordinates(retry) else response